@@ -4,7 +4,7 @@ Client library for interacting with the line sampler server.
 import socket
 import logging
 from typing import List, Optional
-from server.protocol import Protocol, SOCKET_PATH, MAX_MESSAGE_SIZE
+from server.protocol import Protocol, SOCKET_PATH, MAX_FRAME_SIZE
 
 logger = logging.getLogger(__name__)
 
@@ -26,11 +26,14 @@ class LineClient:
             socket_path: Path to server socket
         """
         self.socket_path = socket_path
+        # Reusable receive buffer, grown only for larger responses
+        self._rx = bytearray(65536)
         self._connect()
     
     def _connect(self):
         """Establish connection to server."""
         self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        Protocol.configure_socket(self.socket)
         self.socket.connect(self.socket_path)
     
     def _send_request(self, method: str, params: dict) -> dict:
@@ -45,15 +48,31 @@ class LineClient:
             Response dictionary
             
         Raises:
+            ConnectionError: If the connection is closed or was dropped
+                after an earlier failure
             Exception: If server returns error
         """
-        # Send request
-        request = Protocol.encode_request(method, params)
-        self.socket.sendall(request)
+        if self.socket is None:
+            raise ConnectionError("Connection closed after an earlier error")
         
-        # Receive response
-        response_data = self.socket.recv(MAX_MESSAGE_SIZE)
-        response = Protocol.decode(response_data)
+        request = Protocol.encode_request(method, params)
+        try:
+            # Send request
+            self.socket.sendall(request)
+            
+            # Receive response
+            response_data = Protocol.read_frame(
+                self.socket, self._rx, max_size=MAX_FRAME_SIZE
+            )
+            if response_data is None:
+                raise ConnectionError("Server closed the connection")
+            with response_data:
+                response = Protocol.decode(response_data)
+        except Exception:
+            # A partial or unreadable response leaves the stream out of
+            # sync; never reuse it
+            self.close()
+            raise
         
         if response.get("error"):
             raise Exception(response["error"])
@@ -88,8 +107,9 @@ class LineClient:
     
     def close(self):
         """Close the client connection."""
-        if hasattr(self, 'socket'):
+        if getattr(self, 'socket', None) is not None:
             self.socket.close()
+            self.socket = None
     
     def __enter__(self):
         return self
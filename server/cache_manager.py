@@ -2,10 +2,82 @@
 Thread-safe cache manager for storing and sampling lines from text files.
 Lines are stored and can be randomly sampled without replacement.
 """
+import sys
 import threading
 import random
-from collections import deque
-from typing import List
+from bisect import bisect_right
+from collections import Counter
+from functools import partial
+from itertools import accumulate
+from typing import Dict, Iterable, List
+
+# Number of independently locked shards the lines are spread across.
+# With the GIL, sampling is serialized by the interpreter anyway and
+# extra shards only add bookkeeping, so shard only on free-threaded
+# builds where samplers can really run in parallel.
+NUM_SHARDS = 1 if getattr(sys, "_is_gil_enabled", lambda: True)() else 16
+
+# Shards add_lines tries without blocking before waiting for its
+# round-robin choice
+ADD_LOCK_TRIES = 3
+
+# Above this many lines, sampling draws swap indices from a float in
+# [0, 1) instead of randrange(), trading negligible (~2**-53) bias for
+# much less interpreter overhead per swap
+LARGE_SAMPLE_THRESHOLD = 64
+
+def _swap_to_tail(buf: List[str], n: int, rng: random.Random,
+                  fast: bool = False):
+    """
+    Partial Fisher-Yates: move n uniformly chosen items to the tail of
+    buf, in random order. O(n) and safe with duplicate lines.
+    
+    Args:
+        buf: List to permute in place
+        n: Number of items to select (at most len(buf))
+        rng: Random source
+        fast: Use float-derived indices (see LARGE_SAMPLE_THRESHOLD)
+    """
+    total = len(buf)
+    if fast:
+        rand = rng.random
+        for i in range(total - 1, total - n - 1, -1):
+            j = int(rand() * (i + 1))
+            buf[i], buf[j] = buf[j], buf[i]
+    else:
+        randrange = rng.randrange
+        for i in range(total - 1, total - n - 1, -1):
+            j = randrange(i + 1)
+            buf[i], buf[j] = buf[j], buf[i]
+
+def _split_counts(sizes: List[int], n: int,
+                  rng: random.Random) -> Dict[int, int]:
+    """
+    Decide how many of n lines drawn without replacement come from each
+    shard (a multivariate hypergeometric draw).
+    
+    Args:
+        sizes: Current size of each shard
+        n: Number of lines to draw (at most sum(sizes))
+        rng: Random source
+        
+    Returns:
+        Shard index -> lines to take, for shards that contribute
+    """
+    total = sum(sizes)
+    # Draw distinct global positions; when taking most lines it's
+    # cheaper to draw the ones left behind
+    k = min(n, total - n)
+    chosen = set()
+    add = chosen.add
+    rand = rng.random
+    while len(chosen) < k:
+        add(int(rand() * total))
+    
+    hits = Counter(map(partial(bisect_right, list(accumulate(sizes))), chosen))
+    if k == n:
+        return hits
+    return {i: size - hits[i] for i, size in enumerate(sizes) if size > hits[i]}
 
 class ThreadSafeCache:
     """
@@ -14,18 +86,28 @@ class ThreadSafeCache:
     Features:
     - Add lines to cache
     - Randomly sample lines without replacement
-    - Thread-safe operations using locks
+    - Thread-safe operations using per-shard locks, so concurrent
+      samplers only contend when they hit the same shard
     """
     
-    def __init__(self):
-        """Initialize empty cache with thread lock."""
-        self.available_lines = deque()  # Fast O(1) pops from both ends
+    def __init__(self, num_shards: int = NUM_SHARDS):
+        """
+        Initialize empty cache.
+        
+        Args:
+            num_shards: Number of independently locked shards
+        """
+        self._shards: List[List[str]] = [[] for _ in range(num_shards)]
+        self._locks = [threading.Lock() for _ in range(num_shards)]
+        # Serializes writers; guards _next_shard and total_lines_loaded
         self.lock = threading.Lock()
+        self._next_shard = 0
+        self._rng = random.Random()
         self.total_lines_loaded = 0
     
     def add_lines(self, lines: List[str]) -> int:
         """
-        Add multiple lines to the cache.
+        Add multiple lines to the cache, spread round-robin over shards.
         
         Args:
             lines: List of lines to add
@@ -33,51 +115,141 @@ class ThreadSafeCache:
         Returns:
             Number of lines added
         """
+        num_shards = len(self._shards)
         with self.lock:
-            self.available_lines.extend(lines)
+            start = self._next_shard
+            for k in range(min(num_shards, len(lines))):
+                part = lines if num_shards == 1 else lines[k::num_shards]
+                shard = self._lock_free_shard((start + k) % num_shards)
+                try:
+                    self._shards[shard].extend(part)
+                finally:
+                    self._locks[shard].release()
+            self._next_shard = (start + len(lines)) % num_shards
             self.total_lines_loaded += len(lines)
             return len(lines)
     
+    def _lock_free_shard(self, preferred: int) -> int:
+        """
+        Lock a shard for adding lines without waiting behind a sampler:
+        try a few shards starting at preferred without blocking, and only
+        block on preferred if they are all busy. Which shard receives a
+        batch doesn't affect uniformity, since sampling is proportional
+        to shard sizes.
+        
+        Args:
+            preferred: Shard the round-robin order would use
+            
+        Returns:
+            Index of the shard now locked by the caller
+        """
+        num_shards = len(self._shards)
+        for step in range(min(ADD_LOCK_TRIES, num_shards)):
+            shard = (preferred + step) % num_shards
+            if self._locks[shard].acquire(blocking=False):
+                return shard
+        self._locks[preferred].acquire()
+        return preferred
+    
+    def add_lines_from_iter(self, lines: Iterable[str]) -> int:
+        """
+        Add lines from an iterable (e.g. a lazily decoded file).
+        All-or-nothing: if the iterable raises, nothing is added.
+        
+        Repeated lines within the iterable are stored as one shared
+        string object, so files with many duplicate lines cost far less
+        memory.
+        
+        Args:
+            lines: Iterable of lines, without line endings
+            
+        Returns:
+            Number of lines added
+        """
+        seen = {}
+        intern = seen.setdefault
+        return self.add_lines([intern(line, line) for line in lines])
+    
     def sample(self, n: int) -> List[str]:
         """
         Randomly sample n lines from cache without replacement.
         Sampled lines are removed from available cache.
         
+        The number taken from each shard is drawn in proportion to shard
+        sizes, so every available line is equally likely to be chosen.
+        
         Args:
             n: Number of lines to sample
             
         Returns:
-            List of sampled lines (empty if cache is empty)
+            List of sampled lines in random order (empty if cache is empty)
         """
-        with self.lock:
-            if not self.available_lines or n <= 0:
-                return []
+        if n <= 0:
+            return []
+        
+        # One shard: a single locked draw, nothing to split or merge
+        if len(self._shards) == 1:
+            return self._take(0, n, n > LARGE_SAMPLE_THRESHOLD)
+        
+        sampled: List[str] = []
+        # Another sampler may shrink a shard between the size snapshot
+        # and taking its lock; retry until satisfied or the cache is empty
+        while len(sampled) < n:
+            sizes = list(map(len, self._shards))
+            total = sum(sizes)
+            if total == 0:
+                break
             
             # Can't sample more than available
-            n = min(n, len(self.available_lines))
+            want = min(n - len(sampled), total)
+            fast = want > LARGE_SAMPLE_THRESHOLD
             
-            # Random sampling without replacement
-            # Convert to list for random.sample, then rebuild deque
-            lines_list = list(self.available_lines)
-            sampled = random.sample(lines_list, n)
+            for i, k in _split_counts(sizes, want, self._rng).items():
+                # Order doesn't matter here; the merged result is shuffled
+                sampled.extend(self._take(i, k, fast, shuffle=False))
+        
+        # Mix the per-shard blocks into one random order
+        _swap_to_tail(sampled, len(sampled), self._rng,
+                      len(sampled) > LARGE_SAMPLE_THRESHOLD)
+        
+        return sampled
+    
+    def _take(self, shard: int, k: int, fast: bool,
+              shuffle: bool = True) -> List[str]:
+        """
+        Remove up to k random lines from one shard, under its lock.
+        
+        Args:
+            shard: Shard index
+            k: Number of lines wanted
+            fast: Passed through to _swap_to_tail
+            shuffle: Return the lines in random order; if False, a fully
+                drained shard comes back in storage order
             
-            # Rebuild available lines (excluding sampled ones)
-            sampled_set = set(sampled)
-            self.available_lines = deque(
-                [line for line in lines_list if line not in sampled_set]
-            )
+        Returns:
+            The removed lines
+        """
+        with self._locks[shard]:
+            buf = self._shards[shard]
+            if k >= len(buf):
+                # Drain-all: hand over the whole list, no copy or rebuild
+                self._shards[shard] = []
+                if shuffle:
+                    _swap_to_tail(buf, len(buf), self._rng, fast)
+                return buf
             
-            return sampled
+            _swap_to_tail(buf, k, self._rng, fast)
+            taken = buf[-k:]
+            del buf[-k:]
+            return taken
     
     def size(self) -> int:
-        """Get current number of available lines."""
-        with self.lock:
-            return len(self.available_lines)
+        """Get current number of available lines (lock-free)."""
+        return sum(map(len, self._shards))
     
     def get_stats(self) -> dict:
-        """Get cache statistics."""
-        with self.lock:
-            return {
-                "available_lines": len(self.available_lines),
-                "total_lines_loaded": self.total_lines_loaded
-            }
\ No newline at end of file
+        """Get cache statistics (lock-free, may lag an in-flight write)."""
+        return {
+            "available_lines": self.size(),
+            "total_lines_loaded": self.total_lines_loaded
+        }
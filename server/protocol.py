@@ -1,14 +1,37 @@
 """
 Protocol definitions for client-server communication.
-Uses JSON for message serialization.
+Uses JSON for message serialization, framed with a 4-byte
+big-endian length prefix.
 """
 import json
-from typing import Dict, Any, Optional
+import re
+import socket
+import struct
+from typing import Dict, Any, List, Optional, Tuple
 
 # Socket path for Unix domain socket
 SOCKET_PATH = "/tmp/line_sampler.sock"
-# Maximum message size (10MB)
+# Maximum request size the server accepts (10MB)
 MAX_MESSAGE_SIZE = 10 * 1024 * 1024
+# Kernel send/receive buffer size for connected sockets (4MB); the
+# small AF_UNIX default splits large responses into many short reads
+SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
+# Bytes requested per recv() when reading ahead
+RECV_CHUNK_SIZE = 64 * 1024
+# Most buffers passed to a single sendmsg() call
+SENDMSG_MAX_BUFFERS = 512
+# Frame header: payload length as unsigned 32-bit big-endian
+HEADER = struct.Struct(">I")
+# Largest payload a frame header can describe; responses are only
+# limited by this, since a sample can legitimately be very large
+MAX_FRAME_SIZE = 2 ** 32 - 1
+
+# Shared JSON codec: compact separators and raw UTF-8 instead of \u
+# escapes keep payloads small. 'surrogatepass' lets strings that came
+# from undecodable file names round-trip.
+_ENC = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+_DEC = json.JSONDecoder()
+_ERRORS = 'surrogatepass'
 
 class MessageType:
     """Message type constants."""
@@ -30,14 +53,14 @@ class Protocol:
             params: Method parameters
             
         Returns:
-            JSON-encoded bytes
+            Framed JSON-encoded bytes
         """
         message = {
             "type": "request",
             "method": method,
             "params": params
         }
-        return json.dumps(message).encode('utf-8')
+        return Protocol.frame(_ENC.encode(message).encode('utf-8', _ERRORS))
     
     @staticmethod
     def encode_response(result: Any, error: Optional[str] = None) -> bytes:
@@ -49,19 +72,41 @@ class Protocol:
             error: Error message if any
             
         Returns:
-            JSON-encoded bytes
+            Framed JSON-encoded bytes
+        """
+        return b"".join(Protocol.encode_response_buffers(result, error))
+    
+    @staticmethod
+    def encode_response_buffers(result: Any,
+                                error: Optional[str] = None) -> List[bytes]:
+        """
+        Encode a response message as separate header and payload buffers,
+        for send_buffers() to write without joining them first.
+        
+        Args:
+            result: Success result
+            error: Error message if any
+            
+        Returns:
+            [header, JSON-encoded payload]
+            
+        Raises:
+            ValueError: If the payload exceeds MAX_FRAME_SIZE
         """
         message = {
             "type": "response",
             "result": result,
             "error": error
         }
-        return json.dumps(message).encode('utf-8')
+        body = _ENC.encode(message).encode('utf-8', _ERRORS)
+        if len(body) > MAX_FRAME_SIZE:
+            raise ValueError(f"Response too large: {len(body)} bytes")
+        return [HEADER.pack(len(body)), body]
     
     @staticmethod
     def decode(data: bytes) -> Dict[str, Any]:
         """
-        Decode a message from bytes.
+        Decode a message payload (without its length prefix).
         
         Args:
             data: JSON-encoded bytes
@@ -69,4 +114,235 @@ class Protocol:
         Returns:
             Decoded dictionary
         """
-        return json.loads(data.decode('utf-8'))
\ No newline at end of file
+        return _DEC.decode(str(data, 'utf-8', _ERRORS))
+    
+    @staticmethod
+    def decode_request(data: bytes) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Decode a request payload into its method and params.
+        
+        Requests exactly as encode_request() writes them for 'sample' and
+        'load' are matched directly, without a JSON parse; anything else
+        (other methods, escaped paths, foreign encoders) goes through
+        decode().
+        
+        Args:
+            data: Request payload (without its length prefix)
+            
+        Returns:
+            (method, params) tuple
+            
+        Raises:
+            ValueError: If the payload isn't a request message
+        """
+        match = _FAST_SAMPLE.fullmatch(data)
+        if match:
+            return MessageType.SAMPLE, {"n": int(match.group(1))}
+        match = _FAST_LOAD.fullmatch(data)
+        if match:
+            path = str(match.group(1), 'utf-8', _ERRORS)
+            return MessageType.LOAD, {"file_path": path}
+        
+        message = Protocol.decode(data)
+        if message.get("type") != "request":
+            raise ValueError("Invalid message type")
+        return message.get("method"), message.get("params", {})
+    
+    @staticmethod
+    def configure_socket(sock: socket.socket):
+        """
+        Apply buffer tuning to a connected socket.
+        
+        The kernel may silently cap the size (net.core.wmem_max/rmem_max).
+        
+        Args:
+            sock: Socket to configure
+        """
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+    
+    @staticmethod
+    def frame(body: bytes) -> bytes:
+        """
+        Prefix a payload with its length.
+        
+        Args:
+            body: Encoded payload
+            
+        Returns:
+            Header followed by payload
+        """
+        return HEADER.pack(len(body)) + body
+    
+    @staticmethod
+    def send_buffers(sock: socket.socket, buffers: List[bytes]):
+        """
+        Write a sequence of buffers with vectored sendmsg() calls, like
+        sendall() on their concatenation but without building it.
+        
+        Args:
+            sock: Connected socket
+            buffers: Buffers to send, in order
+        """
+        views = [memoryview(b) for b in buffers if len(b)]
+        while views:
+            # Stay well below the kernel's IOV_MAX (1024 on Linux)
+            sent = sock.sendmsg(views[:SENDMSG_MAX_BUFFERS])
+            # Drop what was fully written, trim a partial write
+            i = 0
+            while i < len(views) and sent >= len(views[i]):
+                sent -= len(views[i])
+                i += 1
+            del views[:i]
+            if sent:
+                views[0] = views[0][sent:]
+    
+    @staticmethod
+    def split_frames(buffer: bytearray) -> List[bytes]:
+        """
+        Remove all complete frames from the front of a buffer.
+        
+        An incomplete trailing frame is left in the buffer for the next
+        read to finish.
+        
+        Args:
+            buffer: Received bytes; consumed frames are deleted in place
+            
+        Returns:
+            Payloads of the complete frames, in order
+            
+        Raises:
+            ValueError: If a frame exceeds MAX_MESSAGE_SIZE
+        """
+        payloads = []
+        offset = 0
+        total = len(buffer)
+        while total - offset >= HEADER.size:
+            (length,) = HEADER.unpack_from(buffer, offset)
+            if length > MAX_MESSAGE_SIZE:
+                raise ValueError(f"Message too large: {length} bytes")
+            end = offset + HEADER.size + length
+            if end > total:
+                break
+            payloads.append(bytes(buffer[offset + HEADER.size:end]))
+            offset = end
+        del buffer[:offset]
+        return payloads
+    
+    @staticmethod
+    def recv_into_exact(sock: socket.socket, view: memoryview) -> bool:
+        """
+        Fill a buffer completely from a socket.
+        
+        Args:
+            sock: Connected socket
+            view: Writable buffer to fill
+            
+        Returns:
+            True once filled, False if the peer closed before sending any
+            
+        Raises:
+            ConnectionError: If the peer closes partway through
+        """
+        size = len(view)
+        received = 0
+        while received < size:
+            n = sock.recv_into(view[received:])
+            if n == 0:
+                if received == 0:
+                    return False
+                raise ConnectionError("Connection closed mid-message")
+            received += n
+        return True
+    
+    @staticmethod
+    def recv_exact(sock: socket.socket, size: int) -> Optional[bytearray]:
+        """
+        Read exactly size bytes from a socket.
+        
+        Args:
+            sock: Connected socket
+            size: Number of bytes to read
+            
+        Returns:
+            The bytes read, or None if the peer closed before sending any
+            
+        Raises:
+            ConnectionError: If the peer closes partway through
+        """
+        buf = bytearray(size)
+        if not Protocol.recv_into_exact(sock, memoryview(buf)):
+            return None
+        return buf
+    
+    @staticmethod
+    def read_frame(sock: socket.socket,
+                   buffer: Optional[bytearray] = None,
+                   max_size: int = MAX_MESSAGE_SIZE):
+        """
+        Read one framed message payload from a socket.
+        
+        Args:
+            sock: Connected socket
+            buffer: Optional reusable receive buffer. It is grown in place
+                when a payload doesn't fit, and the payload is returned as
+                a memoryview into it, valid until the next read.
+            max_size: Largest payload accepted
+            
+        Returns:
+            Payload bytes for decode(), or None if the peer closed the
+            connection
+            
+        Raises:
+            ConnectionError: If the peer closes partway through a message
+            ValueError: If the message exceeds max_size
+        """
+        if buffer is None:
+            header = Protocol.recv_exact(sock, HEADER.size)
+            if header is None:
+                return None
+        else:
+            if len(buffer) < HEADER.size:
+                buffer.extend(bytes(HEADER.size - len(buffer)))
+            with memoryview(buffer) as view:
+                if not Protocol.recv_into_exact(sock, view[:HEADER.size]):
+                    return None
+            header = buffer
+        
+        (length,) = HEADER.unpack_from(header)
+        if length > max_size:
+            raise ValueError(f"Message too large: {length} bytes")
+        
+        if buffer is None:
+            body = Protocol.recv_exact(sock, length)
+            if body is None:
+                raise ConnectionError("Connection closed mid-message")
+            return body
+        
+        if len(buffer) < length:
+            buffer.extend(bytes(length - len(buffer)))
+        body = memoryview(buffer)[:length]
+        if not Protocol.recv_into_exact(sock, body):
+            body.release()
+            raise ConnectionError("Connection closed mid-message")
+        return body
+
+def _request_pattern(method: str, param: str, placeholder: Any,
+                     value: bytes) -> "re.Pattern[bytes]":
+    """
+    Build a regex matching encode_request(method, {param: ...}) payloads
+    byte for byte, with the parameter's encoded value captured by the
+    value pattern. Derived from the encoder itself so the two can't drift.
+    """
+    template = Protocol.encode_request(method, {param: placeholder})[HEADER.size:]
+    encoded = _ENC.encode(placeholder).encode('utf-8')
+    head, _, tail = template.rpartition(encoded)
+    return re.compile(re.escape(head) + value + re.escape(tail))
+
+# Fast paths for the two request shapes clients actually send. Strings
+# are only matched when they need no unescaping; integers only in
+# canonical form.
+_FAST_SAMPLE = _request_pattern(MessageType.SAMPLE, "n", 0, rb'(0|[1-9][0-9]*)')
+_FAST_LOAD = _request_pattern(
+    MessageType.LOAD, "file_path", "", rb'"([^"\\\x00-\x1f]*)"'
+)
@@ -1,19 +1,18 @@
 """
 Main server implementation using Unix domain sockets.
-Handles multiple concurrent clients with threading.
+Handles multiple concurrent clients with a pool of worker threads.
 """
+import argparse
 import os
+import queue
+import signal
 import socket
 import threading
 import logging
+from typing import Dict, List, Optional, Tuple
 from server.cache_manager import ThreadSafeCache
-from server.protocol import Protocol, SOCKET_PATH, MAX_MESSAGE_SIZE
+from server.protocol import Protocol, SOCKET_PATH, RECV_CHUNK_SIZE
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 class LineServer:
@@ -25,21 +24,48 @@ class LineServer:
     - sample(n): Randomly sample n lines from cache
     """
     
-    def __init__(self, socket_path: str = SOCKET_PATH):
+    def __init__(self, socket_path: str = SOCKET_PATH,
+                 num_workers: Optional[int] = None):
         """
         Initialize server.
         
         Args:
             socket_path: Path for Unix domain socket
+            num_workers: Number of worker threads kept alive. Each worker
+                serves one connection at a time; when all are busy an
+                extra worker is started for the new connection and exits
+                once that client disconnects.
         """
         self.socket_path = socket_path
         self.cache = ThreadSafeCache()
         self.server_socket = None
+        self._owner_pid = None
         self.running = False
-        self.threads = []
-        
+        # Same default as concurrent.futures.ThreadPoolExecutor
+        self.num_workers = num_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.job_q = queue.Queue()
+        # Guards the two counters below
+        self._pool_lock = threading.Lock()
+        # Live worker threads, including temporary overflow workers
+        self._worker_count = 0
+        # Workers waiting on job_q that no queued connection has claimed
+        self._idle_workers = 0
+        # (realpath, mtime_ns, size) -> line count of files already loaded
+        self._loaded_files: Dict[Tuple[str, int, int], int] = {}
+        self._load_lock = threading.Lock()
+        # Method name -> handler
+        self._dispatch = {
+            "load": self.handle_load,
+            "sample": self.handle_sample,
+        }
+    
     def start(self):
-        """Start the server."""
+        """Start the server (blocking)."""
+        self.bind()
+        self.serve_forever()
+    
+    def bind(self):
+        """Create the listening socket."""
         # Remove old socket if exists
         try:
             os.unlink(self.socket_path)
@@ -50,26 +76,76 @@ class LineServer:
         # Create socket
         self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self.server_socket.bind(self.socket_path)
-        self.server_socket.listen(5)  # Allow up to 5 pending connections
+        self.server_socket.listen(128)
+        # Only the binding process removes the socket file on stop();
+        # forked workers share the listening socket but not its path
+        self._owner_pid = os.getpid()
+    
+    def serve_forever(self):
+        """Accept and serve clients on the bound socket (blocking)."""
         self.running = True
         
-        logger.info(f"Server started on {self.socket_path}")
+        # Start worker pool
+        with self._pool_lock:
+            for _ in range(self.num_workers):
+                self._spawn_worker()
+                self._idle_workers += 1
+        
+        logger.info("Server started on %s", self.socket_path)
         
         # Main accept loop
         while self.running:
             try:
                 client_socket, client_address = self.server_socket.accept()
-                # Handle each client in a new thread
-                client_thread = threading.Thread(
-                    target=self.handle_client,
-                    args=(client_socket,)
-                )
-                client_thread.daemon = True
-                client_thread.start()
-                self.threads.append(client_thread)
             except Exception as e:
                 if self.running:
-                    logger.error(f"Error accepting connection: {e}")
+                    logger.error("Error accepting connection: %s", e)
+                continue
+            if not self.running:
+                client_socket.close()
+                break
+            self._submit(client_socket)
+    
+    def _submit(self, client_socket: socket.socket):
+        """
+        Hand a connection to an idle worker, starting an extra worker if
+        every existing one is busy with another client.
+        
+        Args:
+            client_socket: Accepted client socket
+        """
+        with self._pool_lock:
+            if self._idle_workers:
+                # Claim the idle worker for this connection
+                self._idle_workers -= 1
+            else:
+                self._spawn_worker()
+        self.job_q.put(client_socket)
+    
+    def _spawn_worker(self):
+        """Start a worker thread. Caller holds _pool_lock."""
+        self._worker_count += 1
+        worker = threading.Thread(target=self._worker)
+        worker.daemon = True
+        worker.start()
+    
+    def _worker(self):
+        """Serve queued client connections until a None sentinel arrives."""
+        while True:
+            client_socket = self.job_q.get()
+            if client_socket is None:
+                break
+            self.handle_client(client_socket)
+            
+            with self._pool_lock:
+                # Overflow workers exit instead of idling
+                if self._worker_count > self.num_workers:
+                    self._worker_count -= 1
+                    return
+                self._idle_workers += 1
+        
+        with self._pool_lock:
+            self._worker_count -= 1
     
     def handle_client(self, client_socket: socket.socket):
         """
@@ -78,68 +154,100 @@ class LineServer:
         Args:
             client_socket: Socket connected to client
         """
-        logger.info(f"New client connected")
+        logger.debug("Client connected")
         
         try:
+            Protocol.configure_socket(client_socket)
+            # Readahead buffer: one recv may carry several pipelined
+            # requests (or part of one)
+            pending = bytearray()
+            chunk = bytearray(RECV_CHUNK_SIZE)
             while True:
-                # Receive message
-                data = client_socket.recv(MAX_MESSAGE_SIZE)
-                if not data:
+                # Receive whatever is available
+                n = client_socket.recv_into(chunk)
+                if n == 0:
                     break
+                pending += memoryview(chunk)[:n]
                 
-                # Parse request
-                try:
-                    message = Protocol.decode(data)
-                    if message.get("type") != "request":
-                        raise ValueError("Invalid message type")
-                    
-                    method = message.get("method")
-                    params = message.get("params", {})
-                    
-                    # Process request
-                    if method == "load":
-                        result = self.handle_load(params)
-                    elif method == "sample":
-                        result = self.handle_sample(params)
-                    else:
-                        raise ValueError(f"Unknown method: {method}")
-                    
-                    # Send response
-                    response = Protocol.encode_response(result)
-                    client_socket.sendall(response)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing request: {e}")
-                    response = Protocol.encode_response(None, str(e))
-                    client_socket.sendall(response)
+                # Answer every complete request with a single write
+                responses = []
+                for data in Protocol.split_frames(pending):
+                    responses.extend(self.handle_request(data))
+                if responses:
+                    Protocol.send_buffers(client_socket, responses)
         
         except Exception as e:
-            logger.error(f"Client connection error: {e}")
+            logger.error("Client connection error: %s", e)
         finally:
             client_socket.close()
-            logger.info("Client disconnected")
+            logger.debug("Client disconnected")
+    
+    def handle_request(self, data: bytes) -> List[bytes]:
+        """
+        Decode, dispatch and answer a single request.
+        
+        Args:
+            data: Request payload (without its length prefix)
+            
+        Returns:
+            Encoded response frame as buffers for Protocol.send_buffers;
+            errors are reported in the response
+        """
+        try:
+            method, params = Protocol.decode_request(data)
+            
+            # Process request
+            handler = self._dispatch.get(method)
+            if handler is None:
+                raise ValueError(f"Unknown method: {method}")
+            result = handler(params)
+            
+            return Protocol.encode_response_buffers(result)
+        
+        except Exception as e:
+            logger.error("Error processing request: %s", e)
+            return Protocol.encode_response_buffers(None, str(e))
     
     def handle_load(self, params: dict) -> dict:
         """
         Handle load request.
         
+        Loading a file that is unchanged since it was last loaded (same
+        path, mtime and size) is a no-op that reports the earlier count.
+        
         Args:
             params: Must contain 'file_path'
             
         Returns:
-            Dictionary with 'lines_read' count
+            Dictionary with 'lines_read' count, plus 'cached': True if
+            the file had already been loaded
         """
         file_path = params.get("file_path")
         if not file_path:
             raise ValueError("Missing file_path parameter")
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                # Strip newlines but keep empty lines
-                lines = [line.rstrip('\n\r') for line in lines]
-            
-            count = self.cache.add_lines(lines)
+            with self._load_lock, open(file_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                key = (os.path.realpath(file_path), st.st_mtime_ns, st.st_size)
+                if key in self._loaded_files:
+                    return {"lines_read": self._loaded_files[key], "cached": True}
+                
+                # One read and one decode, then split at C speed instead of
+                # going through the text layer line by line
+                text = f.read().decode('utf-8')
+                
+                # Same line endings as universal newlines: \n, \r\n and \r.
+                # Empty lines are kept; a trailing newline doesn't add one.
+                if '\r' in text:
+                    text = text.replace('\r\n', '\n').replace('\r', '\n')
+                lines = text.split('\n')
+                if lines[-1] == '':
+                    lines.pop()
+                del text
+                
+                count = self.cache.add_lines_from_iter(lines)
+                self._loaded_files[key] = count
             return {"lines_read": count}
         except Exception as e:
             raise ValueError(f"Error reading file: {e}")
@@ -174,11 +282,29 @@ class LineServer:
         if self.server_socket:
             self.server_socket.close()
         
+        # Close connections no worker has picked up yet
+        while True:
+            try:
+                client_socket = self.job_q.get_nowait()
+            except queue.Empty:
+                break
+            if client_socket is not None:
+                client_socket.close()
+        
+        # Wake each worker once it finishes its current client; the
+        # queue is unbounded so this never blocks
+        with self._pool_lock:
+            workers = self._worker_count
+            self._idle_workers = 0
+        for _ in range(workers):
+            self.job_q.put(None)
+        
         # Clean up socket file
-        try:
-            os.unlink(self.socket_path)
-        except OSError:
-            pass
+        if self._owner_pid == os.getpid():
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
         
         logger.info("Server stopped")
     
@@ -186,15 +312,89 @@ class LineServer:
         """Get server statistics."""
         return self.cache.get_stats()
 
-def run_server():
-    """Run the server (blocking)."""
-    server = LineServer()
+def run_server(workers: int = 1, socket_path: str = SOCKET_PATH):
+    """
+    Run the server (blocking).
+    
+    Args:
+        workers: Number of server processes. With more than one, the
+            listening socket is shared by forked processes and the kernel
+            hands each connection to one of them, so request handling
+            scales past the GIL. Each process has its own cache: lines
+            loaded over one connection can only be sampled from
+            connections served by the same process.
+        socket_path: Path for Unix domain socket
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    
+    # Configured here rather than at import so importing the server
+    # (e.g. from tests) doesn't install a root handler
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(process)d - %(threadName)s - %(levelname)s - %(message)s'
+    )
+    
+    server = LineServer(socket_path)
+    server.bind()
+    
+    # Supervisors stop services with SIGTERM; take the same cleanup path
+    # as Ctrl-C so forked workers are reaped and the socket file removed
+    previous_handler = signal.signal(signal.SIGTERM, _raise_system_exit)
+    children = []
     try:
-        server.start()
+        # Fork before any threads are started
+        for _ in range(workers - 1):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    # The parent stops workers with SIGTERM
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                    server.serve_forever()
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    server.stop()
+                    os._exit(0)
+            children.append(pid)
+        
+        server.serve_forever()
     except KeyboardInterrupt:
         logger.info("Shutting down...")
+    except SystemExit:
+        # SIGTERM: clean up, then exit with the signal's status (143)
+        logger.info("Shutting down...")
+        raise
     finally:
+        # Don't let a second SIGTERM interrupt the cleanup
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
         server.stop()
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            os.waitpid(pid, 0)
+        signal.signal(signal.SIGTERM, previous_handler)
+
+def _raise_system_exit(signum, frame):
+    """SIGTERM handler for run_server: unwind like an interrupt."""
+    raise SystemExit(128 + signum)
+
+def _positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
 
 if __name__ == "__main__":
-    run_server()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Line Sampler Server")
+    parser.add_argument(
+        "--workers", "-w",
+        type=_positive_int,
+        default=1,
+        help="Number of server processes (each has its own cache)"
+    )
+    run_server(parser.parse_args().workers)
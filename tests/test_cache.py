@@ -15,6 +15,30 @@ class TestThreadSafeCache(unittest.TestCase):
         self.assertEqual(count, 3)
         self.assertEqual(self.cache.size(), 3)
     
+    def test_add_lines_from_iter(self):
+        count = self.cache.add_lines_from_iter(iter(["a", "", "c", "d"]))
+        self.assertEqual(count, 4)
+        self.assertEqual(sorted(self.cache.sample(4)), ["", "a", "c", "d"])
+        self.assertEqual(self.cache.get_stats()["total_lines_loaded"], 4)
+    
+    def test_add_lines_from_iter_shares_duplicates(self):
+        # Build equal but distinct string objects, as a file read would
+        raw = ["".join(["d", "up"]) for _ in range(3)]
+        self.cache.add_lines_from_iter(raw)
+        sampled = self.cache.sample(3)
+        self.assertEqual(sampled, ["dup"] * 3)
+        self.assertEqual(len({id(line) for line in sampled}), 1)
+    
+    def test_add_lines_from_iter_failure(self):
+        def broken():
+            yield "a"
+            raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid")
+        
+        with self.assertRaises(UnicodeDecodeError):
+            self.cache.add_lines_from_iter(broken())
+        self.assertEqual(self.cache.size(), 0)
+        self.assertEqual(self.cache.sample(1), [])
+    
     def test_sample_basic(self):
         lines = ["line1", "line2", "line3", "line4", "line5"]
         self.cache.add_lines(lines)
@@ -27,6 +51,15 @@ class TestThreadSafeCache(unittest.TestCase):
         remaining = self.cache.sample(5)
         self.assertEqual(len(remaining), 2)
     
+    def test_sample_large(self):
+        lines = [f"line{i}" for i in range(1000)]
+        self.cache.add_lines(lines)
+        
+        sampled = self.cache.sample(600)
+        self.assertEqual(len(set(sampled)), 600)
+        self.assertEqual(self.cache.size(), 400)
+        self.assertEqual(sorted(sampled + self.cache.sample(400)), sorted(lines))
+    
     def test_sample_no_replacement(self):
         lines = ["line1", "line2", "line3"]
         self.cache.add_lines(lines)
@@ -50,6 +83,29 @@ class TestThreadSafeCache(unittest.TestCase):
         self.assertEqual(len(sampled), 2)
         self.assertEqual(self.cache.size(), 0)
     
+    def test_sample_duplicate_lines(self):
+        lines = ["same"] * 4 + ["other"]
+        self.cache.add_lines(lines)
+        
+        sampled = self.cache.sample(2)
+        remaining = self.cache.sample(5)
+        
+        # Duplicates are sampled independently, none are lost
+        self.assertEqual(len(remaining), 3)
+        self.assertEqual(sorted(sampled + remaining), sorted(lines))
+    
+    def test_sample_drain_all(self):
+        lines = [f"line{i}" for i in range(100)]
+        self.cache.add_lines(lines)
+        
+        sampled = self.cache.sample(1000)
+        self.assertEqual(sorted(sampled), sorted(lines))
+        self.assertEqual(self.cache.size(), 0)
+        
+        # Cache keeps working after being drained
+        self.cache.add_lines(["again"])
+        self.assertEqual(self.cache.sample(1), ["again"])
+    
     def test_sample_empty_cache(self):
         sampled = self.cache.sample(3)
         self.assertEqual(len(sampled), 0)
@@ -77,5 +133,46 @@ class TestThreadSafeCache(unittest.TestCase):
         self.assertEqual(stats["available_lines"], 0)
         self.assertEqual(stats["total_lines_loaded"], 1000)
 
+    def test_concurrent_add_and_sample(self):
+        """Lines are neither lost nor duplicated under concurrent use."""
+        results = []
+        
+        def loader(start):
+            self.cache.add_lines([f"line{i}" for i in range(start, start + 500)])
+        
+        def sampler():
+            for _ in range(50):
+                results.extend(self.cache.sample(7))
+        
+        threads = [threading.Thread(target=loader, args=(i * 500,)) for i in range(4)]
+        threads += [threading.Thread(target=sampler) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        results.extend(self.cache.sample(self.cache.size()))
+        self.assertEqual(sorted(results), sorted(f"line{i}" for i in range(2000)))
+    
+
+class TestShardedCache(TestThreadSafeCache):
+    """Run the same tests with lines spread over several shards."""
+    def setUp(self):
+        self.cache = ThreadSafeCache(num_shards=4)
+    
+    def test_add_skips_busy_shard(self):
+        # A sampler holding one shard doesn't hold up loading
+        with self.cache._locks[0]:
+            t = threading.Thread(target=self.cache.add_lines, args=(["a"],))
+            t.start()
+            t.join(timeout=5)
+            self.assertFalse(t.is_alive())
+        self.assertEqual([len(s) for s in self.cache._shards], [0, 1, 0, 0])
+    
+    def test_lines_spread_over_shards(self):
+        self.cache.add_lines([f"line{i}" for i in range(10)])
+        self.cache.add_lines(["extra"])
+        self.assertEqual([len(s) for s in self.cache._shards], [3, 3, 3, 2])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+Unit tests for Protocol framing.
+"""
+import unittest
+import socket
+import threading
+from server.protocol import (
+    Protocol, HEADER, MAX_MESSAGE_SIZE, _FAST_SAMPLE, _FAST_LOAD
+)
+
+class TestProtocol(unittest.TestCase):
+    def setUp(self):
+        self.left, self.right = socket.socketpair()
+    
+    def tearDown(self):
+        self.left.close()
+        self.right.close()
+    
+    def test_round_trip(self):
+        self.left.sendall(Protocol.encode_request("sample", {"n": 3}))
+        message = Protocol.decode(Protocol.read_frame(self.right))
+        self.assertEqual(message["method"], "sample")
+        self.assertEqual(message["params"], {"n": 3})
+    
+    def test_back_to_back_frames(self):
+        self.left.sendall(
+            Protocol.encode_response({"lines": ["a"]}) +
+            Protocol.encode_response(None, "boom")
+        )
+        first = Protocol.decode(Protocol.read_frame(self.right))
+        second = Protocol.decode(Protocol.read_frame(self.right))
+        self.assertEqual(first["result"], {"lines": ["a"]})
+        self.assertEqual(second["error"], "boom")
+    
+    def test_reusable_buffer(self):
+        buffer = bytearray(8)
+        big = {"lines": ["x" * 100] * 10}
+        self.left.sendall(Protocol.encode_response(big))
+        self.left.sendall(Protocol.encode_response({"lines": []}))
+        
+        with Protocol.read_frame(self.right, buffer) as data:
+            self.assertEqual(Protocol.decode(data)["result"], big)
+        grown = len(buffer)
+        self.assertGreater(grown, 8)
+        
+        # Smaller payloads reuse the grown buffer
+        with Protocol.read_frame(self.right, buffer) as data:
+            self.assertEqual(Protocol.decode(data)["result"], {"lines": []})
+        self.assertEqual(len(buffer), grown)
+    
+    def test_send_buffers(self):
+        # Larger than the socket buffer, so sendmsg writes partially
+        result = {"lines": ["y" * 1000] * 5000}
+        buffers = Protocol.encode_response_buffers(result) * 3
+        sender = threading.Thread(
+            target=Protocol.send_buffers, args=(self.left, buffers)
+        )
+        sender.start()
+        for _ in range(3):
+            message = Protocol.decode(Protocol.read_frame(self.right))
+            self.assertEqual(message["result"], result)
+        sender.join()
+    
+    def test_split_frames(self):
+        first = Protocol.encode_request("sample", {"n": 1})
+        second = Protocol.encode_request("sample", {"n": 2})
+        buffer = bytearray(first + second[:5])
+        
+        payloads = Protocol.split_frames(buffer)
+        self.assertEqual(len(payloads), 1)
+        self.assertEqual(Protocol.decode(payloads[0])["params"], {"n": 1})
+        # Partial frame is kept for the next read
+        self.assertEqual(bytes(buffer), second[:5])
+        
+        buffer += second[5:]
+        payloads = Protocol.split_frames(buffer)
+        self.assertEqual(Protocol.decode(payloads[0])["params"], {"n": 2})
+        self.assertEqual(len(buffer), 0)
+    
+    def test_decode_request(self):
+        cases = [
+            ("sample", {"n": 0}),
+            ("sample", {"n": 1234}),
+            ("sample", {"n": -1}),
+            ("sample", {"n": "5"}),
+            ("load", {"file_path": "/tmp/data.txt"}),
+            ("load", {"file_path": "/tmp/caf\u00e9 \"quoted\"\\x.txt"}),
+            ("load", {"file_path": "/tmp/tab\there"}),
+            ("load", {"file_path": "/tmp/raw\udcff.txt"}),
+            ("load", {}),
+            ("bogus", {"n": 1}),
+        ]
+        for method, params in cases:
+            payload = Protocol.encode_request(method, params)[HEADER.size:]
+            self.assertEqual(Protocol.decode_request(payload), (method, params))
+    
+    def test_fast_path_matches_client_requests(self):
+        sample = Protocol.encode_request("sample", {"n": 10})[HEADER.size:]
+        load = Protocol.encode_request("load", {"file_path": "/tmp/a b.txt"})[HEADER.size:]
+        self.assertIsNotNone(_FAST_SAMPLE.fullmatch(sample))
+        self.assertIsNotNone(_FAST_LOAD.fullmatch(load))
+    
+    def test_decode_request_other_encoders(self):
+        # Same request with different whitespace still decodes
+        payload = b'{"type": "request", "method": "sample", "params": {"n": 7}}'
+        self.assertEqual(Protocol.decode_request(payload), ("sample", {"n": 7}))
+        
+        with self.assertRaises(ValueError):
+            Protocol.decode_request(b'{"type": "response", "result": null}')
+    
+    def test_closed_connection(self):
+        self.left.close()
+        self.assertIsNone(Protocol.read_frame(self.right))
+    
+    def test_truncated_frame(self):
+        frame = Protocol.encode_request("load", {"file_path": "/tmp/x"})
+        self.left.sendall(frame[:-2])
+        self.left.close()
+        with self.assertRaises(ConnectionError):
+            Protocol.read_frame(self.right)
+    
+    def test_oversized_frame(self):
+        self.left.sendall(HEADER.pack(MAX_MESSAGE_SIZE + 1))
+        with self.assertRaises(ValueError):
+            Protocol.read_frame(self.right)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,12 +2,19 @@
 Integration tests for LineServer.
 """
 import unittest
+import logging
 import threading
 import tempfile
 import os
+import queue
+import signal
+import socket
+import subprocess
+import sys
 import time
-from server.server import LineServer
+from server.server import LineServer, run_server
 from client.client import LineClient
+from server.protocol import Protocol, HEADER
 
 class TestLineServer(unittest.TestCase):
     @classmethod
@@ -26,9 +33,13 @@ class TestLineServer(unittest.TestCase):
     
     def setUp(self):
         """Create test data file."""
-        self.test_file = tempfile.NamedTemporaryFile(mode='w', delete=False)
+        # Start from an empty cache; earlier tests may leave lines behind
+        self.server.cache.sample(self.server.cache.size())
+        
         self.test_lines = [f"Line {i}" for i in range(100)]
-        self.test_file.write('\n'.join(self.test_lines))
+        self._blob = '\n'.join(self.test_lines).encode('utf-8')
+        self.test_file = tempfile.NamedTemporaryFile(mode='wb', delete=False)
+        self.test_file.write(self._blob)
         self.test_file.close()
     
     def tearDown(self):
@@ -49,6 +60,18 @@ class TestLineServer(unittest.TestCase):
             for line in sampled:
                 self.assertIn(line, self.test_lines)
     
+    def test_reload_unchanged_file(self):
+        with LineClient("/tmp/test_sampler.sock") as client:
+            self.assertEqual(client.load(self.test_file.name), 100)
+            self.assertEqual(client.load(self.test_file.name), 100)
+            self.assertEqual(self.server.cache.size(), 100)
+            
+            # A modified file is loaded again
+            with open(self.test_file.name, 'a') as f:
+                f.write('\nLine 100')
+            self.assertEqual(client.load(self.test_file.name), 101)
+            self.assertEqual(self.server.cache.size(), 201)
+    
     def test_sample_invalidation(self):
         with LineClient("/tmp/test_sampler.sock") as client:
             client.load(self.test_file.name)
@@ -66,6 +89,63 @@ class TestLineServer(unittest.TestCase):
                 overlap = set(sampled1) & set(sampled2)
                 self.assertEqual(len(overlap), 0)
     
+    def test_load_line_endings(self):
+        """Mixed line endings are split and empty lines are kept."""
+        with tempfile.NamedTemporaryFile(mode='wb', delete=False) as f:
+            f.write(b"a\r\nb\rc\n\nd\n")
+        try:
+            with LineClient("/tmp/test_sampler.sock") as client:
+                self.assertEqual(client.load(f.name), 5)
+                sampled = client.sample(5)
+            self.assertEqual(sorted(sampled), ["", "a", "b", "c", "d"])
+        finally:
+            os.unlink(f.name)
+    
+    def test_large_sample(self):
+        """Responses larger than a single socket read arrive intact."""
+        big_lines = [f"{i:08d} " + "x" * 100 for i in range(20000)]
+        with tempfile.NamedTemporaryFile(mode='w', delete=False) as f:
+            f.write('\n'.join(big_lines))
+        try:
+            with LineClient("/tmp/test_sampler.sock") as client:
+                self.assertEqual(client.load(f.name), len(big_lines))
+                sampled = client.sample(len(big_lines))
+            self.assertEqual(sorted(sampled), big_lines)
+        finally:
+            os.unlink(f.name)
+    
+    def test_pipelined_requests(self):
+        """Several requests sent in one write each get a response."""
+        with LineClient("/tmp/test_sampler.sock") as client:
+            client.socket.sendall(
+                Protocol.encode_request("load", {"file_path": self.test_file.name}) +
+                Protocol.encode_request("sample", {"n": 3}) +
+                Protocol.encode_request("bogus", {})
+            )
+            responses = [
+                Protocol.decode(Protocol.read_frame(client.socket))
+                for _ in range(3)
+            ]
+        self.assertEqual(responses[0]["result"], {"lines_read": 100})
+        self.assertEqual(len(responses[1]["result"]["lines"]), 3)
+        self.assertIn("Unknown method", responses[2]["error"])
+    
+    def test_response_over_max_message_size(self):
+        """Responses aren't capped at the 10MB request limit."""
+        big_lines = [f"{i:08d} " + "x" * 100 for i in range(120000)]
+        with tempfile.NamedTemporaryFile(mode='w', delete=False) as f:
+            f.write('\n'.join(big_lines))
+        try:
+            with LineClient("/tmp/test_sampler.sock") as client:
+                client.load(f.name)
+                sampled = client.sample(len(big_lines))
+                self.assertEqual(sorted(sampled), big_lines)
+                
+                # Connection is still in sync afterwards
+                self.assertEqual(client.sample(1), [])
+        finally:
+            os.unlink(f.name)
+    
     def test_concurrent_clients(self):
         """Test multiple clients accessing simultaneously."""
         def client_work():
@@ -83,5 +163,169 @@ class TestLineServer(unittest.TestCase):
         for t in threads:
             t.join()
 
+class TestWorkerPool(unittest.TestCase):
+    SOCKET = "/tmp/test_sampler_pool.sock"
+    
+    def setUp(self):
+        self.server = LineServer(self.SOCKET, num_workers=2)
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        for _ in range(50):
+            if os.path.exists(self.SOCKET):
+                break
+            time.sleep(0.1)
+    
+    def tearDown(self):
+        self.server.stop()
+    
+    def wait_for_workers(self, count):
+        for _ in range(50):
+            if self.server._worker_count == count:
+                break
+            time.sleep(0.1)
+        self.assertEqual(self.server._worker_count, count)
+    
+    def test_idle_clients_dont_starve_others(self):
+        idle = [LineClient(self.SOCKET) for _ in range(4)]
+        try:
+            with LineClient(self.SOCKET) as client:
+                client.socket.settimeout(3)
+                self.assertEqual(client.sample(1), [])
+        finally:
+            for c in idle:
+                c.close()
+        
+        # Overflow workers exit once their clients are gone
+        self.wait_for_workers(2)
+    
+    def test_stop_exits_workers(self):
+        with LineClient(self.SOCKET) as client:
+            client.sample(1)
+        self.server.stop()
+        self.wait_for_workers(0)
+    
+    def test_stop_closes_queued_connections(self):
+        server = LineServer("/tmp/test_sampler_unused.sock")
+        queued, peer = socket.socketpair()
+        server.job_q.put(queued)
+        server.stop()
+        self.assertEqual(queued.fileno(), -1)
+        peer.close()
+
+class TestClientFramingErrors(unittest.TestCase):
+    SOCKET = "/tmp/test_sampler_framing.sock"
+    
+    def setUp(self):
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            os.unlink(self.SOCKET)
+        except OSError:
+            pass
+        self.listener.bind(self.SOCKET)
+        self.listener.listen(1)
+    
+    def tearDown(self):
+        self.listener.close()
+        os.unlink(self.SOCKET)
+    
+    def test_truncated_response_closes_client(self):
+        def fake_server():
+            conn, _ = self.listener.accept()
+            with conn:
+                Protocol.recv_exact(conn, HEADER.size)
+                # Promise 10 bytes, send 3, then hang up
+                conn.sendall(HEADER.pack(10) + b'{"t')
+        
+        server = threading.Thread(target=fake_server)
+        server.start()
+        client = LineClient(self.SOCKET)
+        with self.assertRaises(ConnectionError):
+            client.sample(1)
+        server.join()
+        
+        # The out-of-sync socket is never reused
+        self.assertIsNone(client.socket)
+        with self.assertRaises(ConnectionError):
+            client.sample(1)
+        client.close()
+
+class TestMultiProcessServer(unittest.TestCase):
+    SOCKET = "/tmp/test_sampler_workers.sock"
+    
+    def start_server(self, workers, **popen_args):
+        proc = subprocess.Popen(
+            [sys.executable, "-c",
+             f"from server.server import run_server; run_server({workers}, {self.SOCKET!r})"],
+            start_new_session=True,
+            **popen_args
+        )
+        for _ in range(50):
+            if os.path.exists(self.SOCKET):
+                break
+            time.sleep(0.1)
+        return proc
+    
+    def test_workers_share_socket(self):
+        proc = self.start_server(3)
+        try:
+            with tempfile.NamedTemporaryFile(mode='wb', delete=False) as f:
+                f.write(b"a\nb\nc")
+            try:
+                # Each connection loads and samples within one process
+                for _ in range(6):
+                    with LineClient(self.SOCKET) as client:
+                        client.load(f.name)
+                        self.assertEqual(len(client.sample(1)), 1)
+            finally:
+                os.unlink(f.name)
+        finally:
+            os.killpg(proc.pid, signal.SIGINT)
+            proc.wait(timeout=10)
+        
+        self.assertFalse(os.path.exists(self.SOCKET))
+    
+    def test_sigterm_stops_workers(self):
+        proc = self.start_server(3, stderr=subprocess.PIPE, text=True)
+        
+        # Every server process logs "<time> - <pid> - ... - Server started";
+        # keep draining stderr so the pipe never fills
+        started = queue.Queue()
+        def read_log():
+            for line in proc.stderr:
+                if "Server started" in line:
+                    started.put(int(line.split(" - ")[1]))
+        reader = threading.Thread(target=read_log)
+        reader.daemon = True
+        reader.start()
+        
+        try:
+            pids = {started.get(timeout=10) for _ in range(3)}
+            children = pids - {proc.pid}
+            self.assertEqual(len(children), 2)
+            
+            # Only the parent is signalled, as a supervisor would
+            proc.send_signal(signal.SIGTERM)
+            self.assertEqual(proc.wait(timeout=10), 128 + signal.SIGTERM)
+        finally:
+            if proc.poll() is None:
+                os.killpg(proc.pid, signal.SIGKILL)
+                proc.wait()
+            reader.join(timeout=5)
+            proc.stderr.close()
+        
+        # Children were reaped by the parent, not orphaned
+        for pid in children:
+            with self.assertRaises(ProcessLookupError):
+                os.kill(pid, 0)
+        self.assertFalse(os.path.exists(self.SOCKET))
+    
+    def test_invalid_worker_count(self):
+        handlers = list(logging.getLogger().handlers)
+        with self.assertRaises(ValueError):
+            run_server(0, self.SOCKET)
+        # Rejected before logging is configured
+        self.assertEqual(logging.getLogger().handlers, handlers)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file